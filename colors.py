@@ -11,7 +11,12 @@ UNDERLINE = "\033[4m"
 
 def color(s, color):
     """Color a string via escape codes"""
-    return color + s + ENDC
+    return f"{color}{s}{ENDC}"
+
+
+# Preformatted results, since nearly every test prints one of these
+PASS_STR = color("PASS", OKGREEN)
+FAIL_STR = color("FAIL", FAIL)
 
 
 def eprint(s):
@@ -24,7 +29,12 @@ def print_mismatch(name, got, expected):
     print("\t" + color("Got: ", FAIL) + str(got))
     print("\t" + color("Expected: ", OKGREEN) + str(expected))
 
+_STATUS_STRS = ("[{}FAIL{}]".format(FAIL, ENDC), "[{}PASS{}]".format(OKGREEN, ENDC))
+
 def fmt_status_bool(s:  bool, pass_str="PASS", fail_str="FAIL"):
+    if (pass_str == "PASS") and (fail_str == "FAIL"):
+        return _STATUS_STRS[bool(s)]
+
     c = OKGREEN if s else FAIL
     s = pass_str if s else fail_str
     return "[{}{}{}]".format(c, s, ENDC)
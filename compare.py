@@ -1,6 +1,5 @@
 import os
 import sys
-import json
 import signal
 import shutil
 import pathlib
@@ -27,64 +26,116 @@ class CompareTestStatus(Enum):
     EXTRA = "extra"
     OK = "ok"
 
+# Enum str()/.value go through descriptor machinery, so precompute the
+# strings used when formatting each entry
+_REASON_STR = {r: str(r) for r in CompareTestStatus}
+_REASON_VALUE = {r: r.value for r in CompareTestStatus}
+_REASON_FAIL_STR = {r: c.color("FAIL ({})".format(_REASON_STR[r]), c.FAIL) for r in CompareTestStatus}
+
 
 @dataclass(init=False)
 class TestCompareEntry(CTRFTest):
+    __slots__ = ("reason", "_output", "_indented_output", "t_actual", "t_expected")
+
     name: str
     status: str
     reason: CompareTestStatus
-    output: str
     t_actual: PATestEntry
     t_expected: PATestEntry
 
     def __init__(self, name, status, reason, output,
-                 t_actual, t_expected, **kwargs):
+                 t_actual, t_expected, output_lines=None, **kwargs):
         super(TestCompareEntry, self).__init__(name, status, **kwargs)
         self.reason = reason
-        self.output = output
+        self._output = output
         self.t_actual = t_actual
         self.t_expected = t_expected
+        self._output_lines = output_lines
+        self._indented_output = None
+
+    @property
+    def output(self):
+        # Built on first use, since most entries are never printed
+        if self._output is None:
+            self._output = self._build_output(self.reason, self.t_actual, self.t_expected)
+        return self._output
 
     def is_passing(self):
-        return self.status == STATUS_PASS
+        return self._passing
 
     def fmt_result(self):
-        return c.color("PASS", c.OKGREEN) if self.is_passing() else c.color("FAIL ({})".format(str(self.reason)), c.FAIL)
+        return self._PASS_STR if self._passing else _REASON_FAIL_STR[self.reason]
 
     def build_ctrf_output(self, d):
-        d["stdout"] = self.output.split("\n")
-        d["message"] = self.reason.value
+        d["stdout"] = self._get_output_lines(self.output)
+        d["message"] = _REASON_VALUE[self.reason]
 
         self.add_extra_item("result_actual", self.t_actual.to_ctrf() if self.t_actual is not None else None)
-        self.add_extra_item("result_expected", self.t_expected.to_ctrf() if self.t_expected is not None else None)
+
+        # When both sides match, result_expected is left out and recovered
+        # from result_actual on load (see add_from_ctrf)
+        if not self._expected_matches_actual():
+            self.add_extra_item("result_expected", self.t_expected.to_ctrf() if self.t_expected is not None else None)
+
+    def _expected_matches_actual(self):
+        return self.is_passing() and \
+            (self.t_actual is not None) and (self.t_expected is not None) and \
+            self.t_actual.same_output(self.t_expected)
 
     @classmethod
     def add_from_ctrf(cls, d, kw):
         _output = cls._get(d, "stdout")
         kw["output"] = "\n".join(_output)
+        kw["output_lines"] = _output
 
         _reason = cls._get(d, "message")
         kw["reason"] = CompareTestStatus(_reason)
 
         cls._add_from_extra(kw, d, "result_actual", "t_actual")
         cls._add_from_extra(kw, d, "result_expected", "t_expected")
+        if ("t_expected" not in kw) and (kw["reason"] == CompareTestStatus.OK):
+            kw["t_expected"] = kw.get("t_actual")
+
+    @classmethod
+    def _fast_from_ctrf(cls, d):
+        _output = cls._get(d, "stdout")
+        reason = CompareTestStatus(cls._get(d, "message"))
+        extra = d.get("extra") or {}
+        t_actual = extra.get("result_actual")
+        t_expected = extra.get("result_expected",
+                               t_actual if reason == CompareTestStatus.OK else None)
+
+        return cls(d["name"], d["status"], reason, "\n".join(_output),
+                   t_actual, t_expected, output_lines=_output,
+                   duration=d.get("duration", 0), suite=d.get("suite"))
 
     def to_json(self):
         d = {
             "name": self.name,
             "status": self.status,
-            "reason": str(self.reason),
+            "reason": _REASON_STR[self.reason],
             "output": self.output,
             "result_actual": self.t_actual.to_json(),
             "result_expected": self.t_expected.to_json(),
         }
         return d
 
+    def get_output(self):
+        return self.output
+
+    def get_indented_output(self):
+        if self._indented_output is None:
+            self._indented_output = self.output.replace("\n", "\n\t")
+        return self._indented_output
+
     @classmethod
-    def _make_output(cls, actual_str, expected_str):
+    def _make_output(cls, actual_str, expected_str, identical=None):
+        if identical is None:
+            identical = (actual_str == expected_str)
+
         if (expected_str == "") and (actual_str == ""):
             ret = ""
-        elif actual_str == expected_str:
+        elif identical:
             ret = "Outputs from test are identical\n```{}\n```".format(expected_str)
         else:
             ret = "Expected:\n```{}\n```\n\nGot:\n```{}\n```".format(expected_str, actual_str)
@@ -92,13 +143,28 @@ class TestCompareEntry(CTRFTest):
         return ret
 
     @classmethod
-    def from_tests(cls, t_actual: PATestEntry | None, t_expected: PATestEntry | None, suite: str|None=None):
-        reason = CompareTestStatus.OK
-        output = ""
-
+    def _build_output(cls, reason, t_actual, t_expected):
         def _out(prefix, output):
             return "{}\n```\n{}\n```".format(prefix, output)
 
+        if reason == CompareTestStatus.MISSING:
+            return _out("Expected test not found in expected results.  Expected output:", t_expected.output)
+        elif reason == CompareTestStatus.EXTRA:
+            return _out("Extra test found not in expected results.  Output:", t_actual.output)
+        elif reason == CompareTestStatus.RESULT_MISMATCH:
+            _comp = cls._make_output(t_actual.output, t_expected.output,
+                                     identical=t_actual.same_output(t_expected))
+            return "Expected test status '{}' but was '{}`\n{}".format(t_expected.status, t_actual.status, _comp)
+        # elif reason == CompareTestStatus.OUTPUT_MISMATCH:
+        #     _comp = cls._make_output(t_actual.output, t_expected.output)
+        #     return "Test outputs differ significantly\n{}".format(t_expected.status, t_actual.status, _comp)
+        else:
+            return t_actual.output
+
+    @classmethod
+    def from_tests(cls, t_actual: PATestEntry | None, t_expected: PATestEntry | None, suite: str|None=None):
+        reason = CompareTestStatus.OK
+
         assert((t_actual is not None)  or (t_expected is not None))
         test_name: str = None
 
@@ -106,12 +172,10 @@ class TestCompareEntry(CTRFTest):
             assert(t_expected is not None)
             test_name = t_expected.name
             reason = CompareTestStatus.MISSING
-            output = _out("Expected test not found in expected results.  Expected output:", t_expected.output)
         elif t_expected is None:
             assert(t_actual is not None)
             test_name = t_actual.name
             reason = CompareTestStatus.EXTRA
-            output = _out("Extra test found not in expected results.  Output:", t_actual.output)
         else:
             assert(t_actual is not None)
             assert(t_expected is not None)
@@ -119,25 +183,23 @@ class TestCompareEntry(CTRFTest):
 
             if t_actual.status != t_expected.status:
                 reason = CompareTestStatus.RESULT_MISMATCH
-                _comp = cls._make_output(t_actual.output, t_expected.output)
-                output = "Expected test status '{}' but was '{}`\n{}".format(t_expected.status, t_actual.status, _comp)
-            # elif t_actual.output != t_expected.output:
+            # elif not t_actual.same_output(t_expected):
             #     reason = CompareTestStatus.OUTPUT_MISMATCH
-            #     _comp = cls._make_output(t_actual.output, t_expected.output)
-            #     output = "Test outputs differ significantly\n{}".format(t_expected.status, t_actual.status, _comp)
             else:
                 reason = CompareTestStatus.OK
-                output = t_actual.output
 
+        # Output text is built lazily by the `output` property
         status = STATUS_PASS if (reason == CompareTestStatus.OK) else STATUS_FAIL
         return cls(name=test_name,
                    status=status,
                    reason=reason,
-                   output=output,
+                   output=None,
                    suite=suite,
                    t_actual=t_actual, t_expected=t_expected)
 
 class CompareResult(CTRFResults):
+    __slots__ = ("_actual", "_expected", "_actual_idx", "_expected_idx",
+                 "tests", "suite", "t_dict", "status", "_passing")
 
     def __init__(self,
                  r_actual: PAResults|None=None,
@@ -148,6 +210,8 @@ class CompareResult(CTRFResults):
         super(CompareResult, self).__init__(**kwargs)
         self._actual = r_actual
         self._expected = r_expected
+        self._actual_idx = r_actual.get_test_map() if r_actual is not None else dict()
+        self._expected_idx = r_expected.get_test_map() if r_expected is not None else dict()
         self.tests: list[TestCompareEntry] = [] if tests is None else tests
         self.suite = suite
 
@@ -156,23 +220,36 @@ class CompareResult(CTRFResults):
             assert(self._expected is not None)
             is_passing = self._build_results()
         else:
-            is_passing = [t.is_passing() for t in self.tests]
+            is_passing = all(t.is_passing() for t in self.tests)
 
+        self.t_dict = {t.name: t for t in self.tests}
         self.status = STATUS_PASS if is_passing else STATUS_FAIL
+        self._passing = is_passing
 
     def get_tests(self):
         return self.tests
 
+    def has_test(self, t_name):
+        return t_name in self.t_dict
+
+    def get_test(self, t_name, missing_ok=False) -> TestCompareEntry:
+        t = self.t_dict.get(t_name)
+        if t is None and not missing_ok:
+            raise ValueError("Result does not have test {}".format(t_name))
+        return t
+
     def is_passing(self):
-        return self.status == STATUS_PASS
+        return self._passing
 
     def build_ctrf_output(self, d):
         pass
 
     @classmethod
     def add_from_ctrf(cls, d, kw):
-        _tests = cls._get(d, "tests")
-        tests = [TestCompareEntry.from_ctrf(t) for t in _tests]
+        _results = cls._get(d, "results")
+        _tests = cls._get(_results, "tests")
+        from_ctrf = TestCompareEntry._fast_from_ctrf
+        tests = [from_ctrf(t) for t in _tests]
         kw["tests"] = tests
 
     # def to_json(self):
@@ -183,61 +260,45 @@ class CompareResult(CTRFResults):
     #     return d
 
     def write_json(self, out_file):
-        with open(str(out_file), "w") as fd:
-            json.dump(self.to_ctrf(), fd,
-                      indent=2)
+        with open(str(out_file), "w", encoding="utf-8") as fd:
+            self.write_ctrf(fd)
 
     def _build_results(self):
         assert(self._actual is not None)
         assert(self._expected is not None)
 
-        ok = True
+        expected_map = self._expected_idx
+        actual_map = self._actual_idx
+        suite = self.suite
+        from_tests = TestCompareEntry.from_tests
 
-        expected_test_names = self._expected.get_test_names()
-        actual_test_names = self._actual.get_test_names()
-        test_names = expected_test_names.copy()
-        for t in actual_test_names:
-            if t not in expected_test_names:
-                test_names.append(t)
+        # Expected tests first (in order), then any extras from the actual run
+        self.tests.extend([from_tests(actual_map.get(name), t_expected, suite)
+                           for name, t_expected in expected_map.items()])
+        self.tests.extend([from_tests(t_actual, None, suite)
+                           for name, t_actual in actual_map.items()
+                           if name not in expected_map])
 
-        for t in test_names:
-            t_actual = self._actual.get_test(t, missing_ok=True)
-            t_expected = self._expected.get_test(t, missing_ok=True)
-
-            entry = TestCompareEntry.from_tests(t_actual=t_actual,
-                                                t_expected=t_expected,
-                                                suite=self.suite)
-
-            self.tests.append(entry)
-
-            ok = ok and entry.is_passing()
-
-        return ok
+        return all(t.is_passing() for t in self.tests)
 
     def print_summary(self, summary_only=False, print_passing=False, descr_on_fail=True, descr_on_pass=True):
-        total = 0
-        passed = 0
-        failed = 0
-        for test in self.tests:
-            if not summary_only:
+        if not summary_only:
+            for test in self.tests:
                 print_test = print_passing or (not test.is_passing())
                 if print_test:
-                    #import pdb; pdb.set_trace()
                     print("{:10}  {}".format(test.name, test.fmt_result()))
                     show_output = (test.is_passing() and descr_on_pass) or ((not test.is_passing()) and descr_on_fail)
                     if show_output:
-                        _output = test.output
-                        output = _output.replace("\n", "\n\t")
+                        output = test.get_indented_output()
                         print(f"\t{output}")
 
-            if test.is_passing():
-                passed += 1
-            else:
-                failed += 1
-
-            total += 1
+        # Same counts as the CTRF summary, which is cached
+        summary = self._make_summary()
+        total = summary["tests"]
+        passed = summary["passed"]
+        failed = summary["failed"]
 
-        if len(self.tests) > 0:
+        if total > 0:
             failed_str = "({} failed)".format(failed) if failed > 0 else ""
             print("=== Check expected results ===\n  Matched: {} / {} tests {} {:>30}".format(passed, total, failed_str, c.fmt_status_bool(self.is_passing())))
         else:
@@ -1,37 +1,47 @@
 import os
 import sys
-import json
 import signal
 import shutil
 import pathlib
 import argparse
 import tempfile
-import functools
 import subprocess
 
+import types
 import dataclasses
 from dataclasses import dataclass, field
 from types import NoneType
 
 from stest import STest, SResults
 
+from json_util import HAS_ORJSON, json_loads, json_dumps, json_dumpb
+
 import colors as c
 
 from enum import Enum
 
+_MISSING = object()
+
 def _get(d, k, default=None, default_none=False):
-    if k in d:
-        return d[k]
+    v = d.get(k, _MISSING)
+    if v is not _MISSING:
+        return v
+    elif (default is not None) or (default_none is True):
+        return default
     else:
-        if (default is not None) or (default_none is True):
-            return default
-        else:
-            raise ValueError(f"{d} not in {d}")
+        raise ValueError(f"{k} not in {d}")
+
+
+def _dumps_at(obj, level):
+    # Indented JSON for a value nested `level` deep in a larger document
+    return json_dumps(obj).replace("\n", "\n" + "  " * level)
 
 
 STATUS_PASS = "passed"
 STATUS_FAIL = "failed"
 
+_EMPTY_EXTRA = types.MappingProxyType({})
+
 class TestStatus(Enum):
     PASSED = "passed"
     FAILED = "failed"
@@ -40,11 +50,18 @@ class TestStatus(Enum):
     OTHER = "other"
 
 class CTRFTest(STest):
+    __slots__ = ("name", "status", "_passing", "duration", "suite",
+                 "tags", "extra", "_output_lines", "_output_str")
+
     name: str
     status: str
-    duration: int = 0
-    suite: str | None = None
-    extra: dict
+    duration: int
+    suite: str | None
+    extra: dict | None
+
+    # Only two possible results, so format them once
+    _PASS_STR = c.PASS_STR
+    _FAIL_STR = c.FAIL_STR
 
     def __init__(self,
                  name: str,
@@ -56,33 +73,43 @@ class CTRFTest(STest):
 
         super(STest, self).__init__()
         self.name = name
-        self.status = status
+        # Only a handful of distinct statuses, so share one string each
+        # rather than keeping a copy per test loaded from JSON
+        self.status = sys.intern(status) if type(status) is str else status
+        self._passing = (status == STATUS_PASS)
         self.duration = duration
         self.suite = suite
         self.tags = []
-        self.extra = extra if extra is not None else dict()
-        self.extra.update(kwargs)
+        # Most tests never get extras, so only allocate the dict on write
+        if kwargs:
+            self.extra = extra if extra is not None else dict()
+            self.extra.update(kwargs)
+        else:
+            self.extra = extra
+        self._output_lines = None
+        self._output_str = None
 
     def get_name(self):
         return self.name
 
     def is_passing(self):
-        return self.status == STATUS_PASS
+        return self._passing
 
     def fmt_result(self):
-        return c.color("PASS", c.OKGREEN) if self.is_passing() else c.color("FAIL", c.FAIL)
+        return self._PASS_STR if self._passing else self._FAIL_STR
 
     def add_extra(self, d: dict):
+        if self.extra is None:
+            self.extra = dict()
         self.extra.update(d)
 
     def add_extra_item(self, k, v):
+        if self.extra is None:
+            self.extra = dict()
         self.extra[k] = v
 
     def get_extra(self):
-        return self.extra
-
-    def fmt_result(self):
-        return c.color("PASS", c.OKGREEN) if self.is_passing() else c.color("FAIL", c.FAIL)
+        return self.extra if self.extra is not None else _EMPTY_EXTRA
 
     def get_score_str(self):
         return ""
@@ -92,10 +119,17 @@ class CTRFTest(STest):
         raise NotImplementedError("yo")
 
     def get_output(self):
-        d = dict()
-        self.build_ctrf_output(d)
-        output = "\n".join(d["stdout"])
-        return output
+        if self._output_str is None:
+            d = dict()
+            self.build_ctrf_output(d)
+            self._output_str = "\n".join(d["stdout"])
+        return self._output_str
+
+    def _get_output_lines(self, output):
+        # Split form of the output, as stored in CTRF "stdout"
+        if self._output_lines is None:
+            self._output_lines = output.split("\n")
+        return self._output_lines
 
     def to_ctrf(self):
         d = {
@@ -103,33 +137,33 @@ class CTRFTest(STest):
             "status": self.status,
             "duration": 0,
             "tags": self.tags,
-            "extra": self.extra,
+            "extra": None,
         }
         if self.suite:
             d["suite"] = self.suite
 
+        # Subclasses may add extras here, so fill in "extra" afterward
         self.build_ctrf_output(d)
+        d["extra"] = self.extra if self.extra is not None else dict()
         return d
 
     @classmethod
     def _get(cls, d, k):
-        if k in d:
-            return d[k]
-        else:
-            raise ValueError(f"{d} not in {d}")
+        v = d.get(k, _MISSING)
+        if v is _MISSING:
+            raise ValueError(f"{k} not in {d}")
+        return v
 
     @classmethod
     def _get_maybe(cls, d, k, default):
-        if k in d:
-            return d[k]
-        else:
-            return default
+        return d.get(k, default)
 
 
     @classmethod
     def _addif(cls, kw, d, k, k_arg=None):
-        if k in d:
-            kw[k_arg if k_arg else k] = d[k]
+        v = d.get(k, _MISSING)
+        if v is not _MISSING:
+            kw[k_arg if k_arg else k] = v
 
     @classmethod
     def _add_from_extra(cls, kw, d, k, k_arg=None):
@@ -157,14 +191,24 @@ class CTRFTest(STest):
 
         return cls(**kwargs)
 
-@dataclass
+    @classmethod
+    def _fast_from_ctrf(cls, d):
+        # Subclasses with a fixed schema construct directly from `d`,
+        # skipping the kwargs-building in from_ctrf
+        return cls.from_ctrf(d)
+
+@dataclass(slots=True)
 class CTRFTool():
     name: str = "pa_run"
     version: str = "0.1"
     extra: dict = field(default_factory=dict)
 
     def to_json(self):
-        return self.__dict__.copy()
+        return {
+            "name": self.name,
+            "version": self.version,
+            "extra": self.extra,
+        }
 
     @classmethod
     def from_json(cls, d):
@@ -172,6 +216,8 @@ class CTRFTool():
 
 
 class CTRFResults(SResults):
+    __slots__ = ("report_format", "version", "tool", "extra", "_summary_cache")
+
     report_format: str
     version: str
     tool: CTRFTool
@@ -185,6 +231,7 @@ class CTRFResults(SResults):
         self.version = version
         self.tool = CTRFTool() if tool is None else tool
         self.extra = dict() if extra is None else extra
+        self._summary_cache = None
 
     def get_tests(self):
         raise NotImplementedError("Subclass must implement")
@@ -212,8 +259,9 @@ class CTRFResults(SResults):
 
     @classmethod
     def _addif(cls, kw, d, k, k_arg=None):
-        if k in d:
-            kw[k_arg if k_arg else k] = d[k]
+        v = d.get(k, _MISSING)
+        if v is not _MISSING:
+            kw[k_arg if k_arg else k] = v
 
     @classmethod
     def _add_from_extra(cls, kw, d, k, remove=True):
@@ -224,10 +272,10 @@ class CTRFResults(SResults):
 
     @classmethod
     def _get(cls, d, k):
-        if k in d:
-            return d[k]
-        else:
-            raise ValueError(f"{d} not in {d}")
+        v = d.get(k, _MISSING)
+        if v is _MISSING:
+            raise ValueError(f"{k} not in {d}")
+        return v
 
     def add_extra(self, d: dict):
         self.extra.update(d)
@@ -235,19 +283,14 @@ class CTRFResults(SResults):
     def add_extra_item(self, k, v):
         self.extra[k] = v
 
-    @functools.cache
     def _make_summary(self):
-        total = 0
-        passed = 0
-        failed = 0
-
-        for t in self.get_tests():
-            if t.is_passing():
-                passed += 1
-            else:
-                failed += 1
+        if self._summary_cache is not None:
+            return self._summary_cache
 
-            total += 1
+        tests = self.get_tests()
+        total = len(tests)
+        passed = sum(1 for t in tests if t.is_passing())
+        failed = total - passed
 
         ret = {
             "tests": total,
@@ -261,6 +304,7 @@ class CTRFResults(SResults):
             "end": 0,
         }
 
+        self._summary_cache = ret
         return ret
 
     def _make_results(self):
@@ -294,6 +338,34 @@ class CTRFResults(SResults):
 
         return ret
 
+    def write_ctrf(self, fd):
+        # Same document as to_ctrf(), but each test is serialized and
+        # written as we go instead of building the whole report first
+        fd.write("{\n")
+        fd.write('  "reportFormat": {},\n'.format(_dumps_at(self.report_format, 1)))
+        fd.write('  "version": {},\n'.format(_dumps_at(self.version, 1)))
+        fd.write('  "results": {\n')
+        fd.write('    "tool": {},\n'.format(_dumps_at(self.tool.to_json(), 2)))
+
+        fd.write('    "tests": [')
+        sep = "\n      "
+        for t in self.get_tests():
+            fd.write(sep)
+            fd.write(_dumps_at(t.to_ctrf(), 3))
+            sep = ",\n      "
+        fd.write("]" if sep == "\n      " else "\n    ]")
+        fd.write(",\n")
+
+        fd.write('    "summary": {},\n'.format(_dumps_at(self._make_summary(), 2)))
+
+        d = dict()
+        self.build_ctrf_output(d)
+        fd.write('    "extra": {}\n'.format(_dumps_at(self.extra, 2)))
+        fd.write("  }")
+        for k, v in d.items():
+            fd.write(",\n  {}: {}".format(json_dumps(k), _dumps_at(v, 1)))
+        fd.write("\n}")
+
 
     @classmethod
     def from_ctrf(cls, d):
@@ -314,11 +386,15 @@ class CTRFResults(SResults):
 
         return cls(**kwargs)
 
+    @classmethod
+    def from_parsed(cls, json_data):
+        return cls.from_ctrf(json_data)
+
     @classmethod
     def from_json_file(cls, json_file):
-        with open(json_file, "r") as fd:
-            json_data = json.load(fd)
-            return cls.from_ctrf(json_data)
+        with open(json_file, "rb") as fd:
+            json_data = json_loads(fd.read())
+            return cls.from_parsed(json_data)
 
 
 class Test_PATestEntry(CTRFTest):
@@ -24,16 +24,22 @@ from stest import STest, SResults
 STATUS_PASS = "passed"
 STATUS_FAIL = "failed"
 
+_MISSING = object()
+
 def _get(d, k, default=None):
-    if k in d:
-        return d[k]
+    v = d.get(k, _MISSING)
+    if v is not _MISSING:
+        return v
+    elif default is not None:
+        return default
     else:
-        if default is not None:
-            return default
-        else:
-            raise ValueError(f"{d} not in {d}")
+        raise ValueError(f"{k} not in {d}")
 
 class GSTest(STest):
+    __slots__ = ("name", "output", "status", "score", "max_score",
+                 "output_format", "visibility", "tags", "_passing",
+                 "_indented_output")
+
     name: str
     output: str
     status: str
@@ -54,7 +60,7 @@ class GSTest(STest):
         self.status = status
         self.score = score
         self.max_score = max_score
-        self.outut_format = output_format
+        self.output_format = output_format
         self.visibility = visibility
 
         if tags is None:
@@ -62,17 +68,26 @@ class GSTest(STest):
         else:
             self.tags = tags
 
+        if self.status != "":
+            self._passing = (self.status == STATUS_PASS)
+        else:
+            self._passing = (self.score == self.max_score)
+
+        self._indented_output = None
+
     def get_name(self):
         return self.name
 
     def get_output(self):
         return self.output
 
+    def get_indented_output(self):
+        if self._indented_output is None:
+            self._indented_output = self.output.replace("\n", "\n\t")
+        return self._indented_output
+
     def is_passing(self):
-        if self.status != "":
-            return self.status == STATUS_PASS
-        else:
-            return self.score == self.max_score
+        return self._passing
 
     def has_points(self):
         return self.max_score != 0
@@ -87,7 +102,7 @@ class GSTest(STest):
             return ""
 
     def fmt_result(self):
-        return c.color("PASS", c.OKGREEN) if self.is_passing() else c.color("FAIL", c.FAIL)
+        return c.PASS_STR if self.is_passing() else c.FAIL_STR
 
     @classmethod
     def from_json(cls, d):
@@ -153,63 +168,48 @@ class GSResults(SResults):
 
         return GSResults(_exec_time, tests)
 
+    @classmethod
+    def from_parsed(cls, json_data):
+        return cls.from_json(json_data)
+
     @classmethod
     def from_json_file(cls, json_file):
         with open(json_file, "r") as fd:
             json_data = json.load(fd)
-            return cls.from_json(json_data)
+            return cls.from_parsed(json_data)
 
     def show(self, descr_on_fail=True, descr_on_pass=True):
-        total_points = 0.0
-        points_earned = 0.0
-        total = 0
-        passed = 0
-        failed = 0
         for test in self.tests:
             print("{}: {:10}  {}".format(test.fmt_result(), test.get_score_str(), test.name))
-            show_output = (test.is_passing() and descr_on_pass) or ((not test.is_passing()) and descr_on_fail)
+            passing = test.is_passing()
+            show_output = (passing and descr_on_pass) or ((not passing) and descr_on_fail)
             if show_output:
-                _output = test.output
-                output = _output.replace("\n", "\n\t")
+                output = test.get_indented_output()
                 print(f"\n{output}")
 
-            if test.has_points():
-                total_points += test.max_score
-                points_earned += test.score
-
-            if test.is_passing():
-                passed += 1
-            else:
-                failed += 1
-
-            total += 1
-
         print("\n**** SUMMARY ****")
-        print("Tests:  {},  PASS:  {}, FAIL:  {}".format(total, passed, failed))
-        print("Score:  {}/{}".format(points_earned, total_points))
+        print("Tests:  {},  PASS:  {}, FAIL:  {}".format(self.t_total, self.t_passed, self.t_failed))
+        print("Score:  {}/{}".format(self.t_score, self.t_max_score))
 
 
     def _set_score_info(self):
         total_points = 0.0
         points_earned = 0.0
-        total = 0
         passed = 0
-        failed = 0
 
+        # One pass over the tests, reading fields directly
         for test in self.tests:
-            if test.has_points():
-                total_points += test.max_score
+            max_score = test.max_score
+            if max_score != 0:
+                total_points += max_score
                 points_earned += test.score
 
-            if test.is_passing():
+            if test._passing:
                 passed += 1
-            else:
-                failed += 1
-
-            total += 1
 
+        total = len(self.tests)
         self.t_passed = passed
-        self.t_failed = failed
+        self.t_failed = total - passed
         self.t_total = total
         self.t_score = points_earned
         self.t_max_score = total_points
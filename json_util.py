@@ -0,0 +1,30 @@
+import json
+
+HAS_ORJSON = False
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    pass
+
+
+def json_loads(data):
+    if HAS_ORJSON:
+        return orjson.loads(data)
+    else:
+        return json.loads(data)
+
+# orjson always writes non-ASCII characters as-is, so the stdlib
+# fallback does the same and both give identical output
+def json_dumps(obj):
+    if HAS_ORJSON:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+    else:
+        return json.dumps(obj, indent=2, ensure_ascii=False)
+
+def json_dumpb(obj):
+    # Same as json_dumps, but as UTF-8 bytes ready to write to a file
+    if HAS_ORJSON:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    else:
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
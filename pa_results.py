@@ -1,37 +1,60 @@
 import os
 import sys
-import json
-import signal
-import shutil
+import functools
 import pathlib
-import argparse
-import tempfile
-import subprocess
 
 import dataclasses
 from dataclasses import dataclass, field
-from types import NoneType
 
-from ctrf_results import CTRFTest, CTRFResults
+from ctrf_results import CTRFTest, CTRFResults, json_loads, json_dumpb, \
+    STATUS_PASS, STATUS_FAIL, _get
 import colors as c
 
-STATUS_PASS = "passed"
-STATUS_FAIL = "failed"
 
+# Loaded files are cached by (path, mtime, size), so re-reading a file
+# that has not changed skips the parse
+JSON_CACHE_SIZE = 128
 
-def _get(d, k, default=None, default_none=False):
-    if k in d:
-        return d[k]
-    else:
-        if (default is not None) or (default_none is True):
-            return default
-        else:
-            raise ValueError(f"{d} not in {d}")
+def _file_key(path):
+    st = os.stat(path)
+    return (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+
+
+@functools.lru_cache(maxsize=JSON_CACHE_SIZE)
+def _load_json_cached(path, mtime_ns, size):
+    # Callers must treat the result as read-only, since it is shared
+    with open(path, "rb") as fd:
+        return json_loads(fd.read())
+
+
+@functools.lru_cache(maxsize=JSON_CACHE_SIZE)
+def _load_paconfig_cached(cls, path, mtime_ns, size):
+    return cls._load_json_file(path)
+
+
+def _debug_post_mortem():
+    # Set PA_DEBUG to drop into the debugger when a config fails to decode
+    if os.environ.get("PA_DEBUG"):
+        import pdb; pdb.post_mortem()
 
 
-@dataclass(init=False)
+# Field names are fixed per class, so compute them once rather than
+# on every _from_kwargs() call
+@functools.cache
+def _field_names(cls):
+    return frozenset(f.name for f in dataclasses.fields(cls))
+
+def _from_kwargs(cls, kwargs):
+    # Drop unknown keys, then use the generated __init__
+    names = _field_names(cls)
+    if names.issuperset(kwargs):
+        return cls(**kwargs)
+    return cls(**{k: v for k, v in kwargs.items() if k in names})
+
+
+@dataclass(slots=True)
 class PaGradeEntry():
-    title: str
+    title: str = None
     max: int = 0
     hidden: bool = False
     no_total: bool = False
@@ -39,30 +62,38 @@ class PaGradeEntry():
     is_extra: bool = False
     concealed: bool = False
 
-    def __init__(self, **kwargs):
-        names = set([f.name for f in dataclasses.fields(self)])
-        for k, v in kwargs.items():
-            if k in names:
-                 self.__setattr__(k, v)
-
     def to_json(self):
-        d = {k: v for k, v in self.__dict__.items() if v is not False}
+        # Fields are only written when set
+        d = {}
+        if self.title is not None:
+            d["title"] = self.title
+        d["max"] = self.max
+        if self.hidden:
+            d["hidden"] = self.hidden
+        if self.no_total:
+            d["no_total"] = self.no_total
+        if self.max_visible:
+            d["max_visible"] = self.max_visible
+        if self.is_extra:
+            d["is_extra"] = self.is_extra
+        if self.concealed:
+            d["concealed"] = self.concealed
         return d
 
     @classmethod
     def from_json(cls, jd):
         try:
-            ret = PaGradeEntry(**jd)
+            ret = _from_kwargs(cls, jd)
             return ret
         except Exception as e:
-            import pdb; pdb.set_trace()
-            raise e
+            _debug_post_mortem()
+            raise ValueError(f"Failed to decode {cls.__name__}: {jd}") from e
 
 
-@dataclass(init=False)
+@dataclass(slots=True)
 class PaRunner():
-    title: str
-    display_title: str
+    title: str = None
+    display_title: str = None
     command: str = "/bin/true"
     visible: bool = False
     transfer_warnings: bool = False
@@ -70,66 +101,80 @@ class PaRunner():
     require: str = None
     eval: str = None
 
-    def __init__(self, **kwargs):
-        names = set([f.name for f in dataclasses.fields(self)])
-        for k, v in kwargs.items():
-            if k in names:
-                 self.__setattr__(k, v)
-
     def is_interactive(self):
         return self.xterm_js
 
     def to_json(self):
-        return self.__dict__.copy()
+        d = {
+            "command": self.command,
+            "visible": self.visible,
+            "transfer_warnings": self.transfer_warnings,
+            "xterm_js": self.xterm_js,
+        }
+        # Optional fields are only written when set
+        if self.title is not None:
+            d["title"] = self.title
+        if self.display_title is not None:
+            d["display_title"] = self.display_title
+        if self.require is not None:
+            d["require"] = self.require
+        if self.eval is not None:
+            d["eval"] = self.eval
+        return d
 
     @classmethod
     def from_json(cls, jd):
         try:
-            ret = PaRunner(**jd)
+            ret = _from_kwargs(cls, jd)
             return ret
         except Exception as e:
-            import pdb; pdb.set_trace()
-            raise e
+            _debug_post_mortem()
+            raise ValueError(f"Failed to decode {cls.__name__}: {jd}") from e
 
 
-@dataclass(init=True)
+@dataclass(slots=True)
 class PaConfig():
-    key: str
-    psetid: int
-    title: str
-    runners: dict[str,PaRunner]
-    grades: dict[str,PaGradeEntry]
+    key: str = None
+    psetid: int = None
+    title: str = None
+    runners: dict[str,PaRunner] = field(default_factory=dict)
+    grades: dict[str,PaGradeEntry] = field(default_factory=dict)
     directory: str = "."
 
-    def __init__(self, **kwargs):
-        names = set([f.name for f in dataclasses.fields(self)])
-        for k, v in kwargs.items():
-            if k in names:
-                self.__setattr__(k, v)
-
     @classmethod
     def from_json_file(cls, config_file):
-        def _decode(jd):
-            if "runners" in jd:
-                orig_runners = jd["runners"]
-                jd["runners"] = {k: PaRunner.from_json(v) for k, v in orig_runners.items()}
-            if "grades" in jd:
-                orig_grades = jd["grades"]
-                jd["grades"] = {k: PaGradeEntry.from_json(v) for k, v in orig_grades.items()}
-
-            return jd
-
-        with open(config_file, "r") as json_fd:
-            _jd = json.load(json_fd, object_hook=_decode)
-            try:
-                ret = cls(**_jd)
-                return ret
-            except Exception as e:
-                import pdb; pdb.set_trace()
-                raise e
+        # Configs are not modified after loading, so repeat loads of an
+        # unchanged file share one instance
+        return _load_paconfig_cached(cls, *_file_key(config_file))
+
+    @classmethod
+    def invalidate(cls):
+        _load_paconfig_cached.cache_clear()
+
+    @classmethod
+    def _load_json_file(cls, config_file):
+        with open(config_file, "rb") as json_fd:
+            _jd = json_loads(json_fd.read())
+
+        # Only the runners/grades containers need decoding, so convert
+        # those directly instead of inspecting every object in the file
+        for key, from_json in (("runners", PaRunner.from_json),
+                               ("grades", PaGradeEntry.from_json)):
+            entries = _jd.get(key)
+            if entries is not None:
+                _jd[key] = {k: from_json(v) for k, v in entries.items()}
+
+        try:
+            ret = _from_kwargs(cls, _jd)
+            return ret
+        except Exception as e:
+            _debug_post_mortem()
+            raise ValueError(f"Failed to decode {cls.__name__} from {config_file}") from e
 
 
 class PATestEntry(CTRFTest):
+    __slots__ = ("output", "output_format", "visibility")
+
     name: str
     output: str
     status: str
@@ -142,9 +187,10 @@ class PATestEntry(CTRFTest):
     def __init__(self, name="", output="", status="",
                  output_format="text", visibility="visible",
                  suite=None, extra=None,
-                 duration=0, tags=None):
+                 duration=0, tags=None, output_lines=None):
         super(PATestEntry, self).__init__(name, status, suite=suite, extra=extra)
         self.output = output
+        self._output_lines = output_lines
         self.output_format = output_format
         self.visibility = visibility
         self.duration = duration
@@ -154,20 +200,39 @@ class PATestEntry(CTRFTest):
         else:
             self.tags = tags
 
+    def same_output(self, other: 'PATestEntry') -> bool:
+        # Cheap checks first:  only fall back to comparing the full
+        # strings if the lengths match
+        if self.output is other.output:
+            return True
+        if len(self.output) != len(other.output):
+            return False
+        return self.output == other.output
+
     def has_points(self):
         return False
 
     def get_score_str(self):
         return ""
 
-    def fmt_result(self):
-        return c.color("PASS", c.OKGREEN) if self.is_passing() else c.color("FAIL", c.FAIL)
-
     def to_json(self):
-        return self.__dict__.copy()
+        return {
+            "name": self.name,
+            "status": self.status,
+            "duration": self.duration,
+            "suite": self.suite,
+            "tags": self.tags,
+            "extra": self.extra if self.extra is not None else dict(),
+            "output": self.output,
+            "output_format": self.output_format,
+            "visibility": self.visibility,
+        }
+
+    def get_output(self):
+        return self.output
 
     def build_ctrf_output(self, d):
-        d["stdout"] = self.output.split("\n")
+        d["stdout"] = self._get_output_lines(self.output)
 
         _extra =  {
             "visibility": self.visibility,
@@ -177,27 +242,46 @@ class PATestEntry(CTRFTest):
 
     @classmethod
     def from_basic_json(cls, d, suite=None):
-        return PATestEntry(suite=suite, **d)
+        if d.get("extra") is not None:
+            # Don't let add_extra() write through to the source dict
+            d = dict(d)
+            d["extra"] = dict(d["extra"])
+        return cls(suite=suite, **d)
 
     @classmethod
     def add_from_ctrf(cls, d, kw):
         _output = _get(d, "stdout", "")
         kw["output"] = "\n".join(_output)
+        if isinstance(_output, list):
+            kw["output_lines"] = _output
 
         cls._add_from_extra(kw, d, "visibility")
         cls._add_from_extra(kw, d, "output_format")
 
+    @classmethod
+    def _fast_from_ctrf(cls, d):
+        _output = d.get("stdout", "")
+        extra = d.get("extra") or {}
+
+        return cls(name=d.get("name", ""),
+                   status=d.get("status", ""),
+                   output="\n".join(_output),
+                   output_lines=_output if isinstance(_output, list) else None,
+                   output_format=extra.get("output_format", "text"),
+                   visibility=extra.get("visibility", "visible"),
+                   suite=d.get("suite"),
+                   duration=d.get("duration", 0))
+
 
 class PAResults(CTRFResults):
     tests: list[PATestEntry]
-    t_dict: dict[str, PATestEntry]
     execution_time: int
     notes: dict | None
     grades: dict[str, PaGradeEntry] | None
     output: str
     runner_rv: int
 
-    @dataclass
+    @dataclass(slots=True)
     class GradeSpec:
         name: str
         rubric: PaGradeEntry
@@ -214,7 +298,6 @@ class PAResults(CTRFResults):
 
         self.execution_time = execution_time
         self.tests = tests if tests is not None else []
-        self.t_dict = {t.name: t for t in tests} if tests is not None else dict()
 
         self.suite = suite
         self.grades = grades
@@ -227,9 +310,17 @@ class PAResults(CTRFResults):
     def get_tests(self) -> list[PATestEntry]:
         return self.tests
 
+    @functools.cached_property
+    def t_dict(self) -> dict[str, PATestEntry]:
+        # Only built once something looks up a test by name
+        return {t.name: t for t in self.tests}
+
     def get_test_names(self):
         return list(self.t_dict.keys())
 
+    def get_test_map(self) -> dict[str, PATestEntry]:
+        return self.t_dict
+
     def has_test(self, t_name):
         return t_name in self.t_dict
 
@@ -250,11 +341,7 @@ class PAResults(CTRFResults):
         return len(self.tests) > 0
 
     def is_passing(self):
-        if len(self.tests) == 0:
-            # Want to trigger failure if no tests are present
-            return False
-        else:
-            return all([t.is_passing() for t in self.tests])
+        return self._passing
 
     def add_grading_rubric(self, rubric_info: dict[str,PaGradeEntry]):
         self.grades = rubric_info
@@ -263,8 +350,8 @@ class PAResults(CTRFResults):
         self.notes = notes
 
     def add_notes_file(self, notes_file: pathlib.Path | str):
-        with open(str(notes_file), "r") as fd:
-            jd = json.load(fd)
+        with open(str(notes_file), "rb") as fd:
+            jd = json_loads(fd.read())
             self.add_notes(jd)
 
     def has_notes(self):
@@ -312,11 +399,11 @@ class PAResults(CTRFResults):
 
     @classmethod
     def from_empty(cls, suite=None):
-        return PAResults(execution_time=0, tests=dict(), suite=suite)
+        return PAResults(execution_time=0, tests=[], suite=suite)
 
     @classmethod
     def from_log(cls, log_file, rv, suite=None):
-        results = PAResults(execution_time=0, tests=dict(), suite=suite)
+        results = PAResults(execution_time=0, tests=[], suite=suite)
         with open(log_file, "r") as log_fd:
             output = log_fd.read()
             results.add_run_output(output, rv)
@@ -346,11 +433,13 @@ class PAResults(CTRFResults):
         _tests = _get(json_data, "tests")
         _exec_time = _get(json_data, "execution_time", 0)
         _grades = _get(json_data, "grades", None, default_none=True)
-        grades = {k: PaGradeEntry.from_json(v) for k, v in _grades.items()} \
+        grade_from_json = PaGradeEntry.from_json
+        grades = {k: grade_from_json(v) for k, v in _grades.items()} \
             if _grades is not None else None
         notes = _get(json_data, "notes", None, default_none=True)
-        extra = _get(json_data, "extra", dict())
-        tests = [PATestEntry.from_basic_json(t, suite=suite) for t in _tests]
+        extra = dict(_get(json_data, "extra", dict()))
+        test_from_json = PATestEntry.from_basic_json
+        tests = [test_from_json(t, suite=suite) for t in _tests]
 
         return PAResults(_exec_time,
                          tests=tests,
@@ -360,9 +449,31 @@ class PAResults(CTRFResults):
                          extra=extra)
     @classmethod
     def from_runner_json_file(cls, json_file, suite=None):
-        with open(json_file, "r") as fd:
-            json_data = json.load(fd)
-            return cls.from_runner_json(json_data, suite=suite)
+        # Results get modified after loading (rubric, notes, ...), so
+        # only the parsed JSON is cached and each call builds new objects
+        json_data = _load_json_cached(*_file_key(json_file))
+        return cls.from_runner_json(json_data, suite=suite)
+
+    @classmethod
+    def summary_from_json_file(cls, json_file):
+        json_data = _load_json_cached(*_file_key(json_file))
+        return cls.summary_from_parsed(json_data)
+
+    @classmethod
+    def summary_from_parsed(cls, json_data):
+        # (passed, failed, total) straight from the JSON, for callers
+        # that don't need the tests themselves.  Accepts both CTRF and
+        # runner output.
+        if "results" in json_data:
+            json_data = json_data["results"]
+        tests = _get(json_data, "tests")
+        total = len(tests)
+        passed = sum(1 for t in tests if t.get("status") == STATUS_PASS)
+        return (passed, total - passed, total)
+
+    @classmethod
+    def invalidate(cls):
+        _load_json_cached.cache_clear()
 
     def build_ctrf_output(self, d):
         if self.grades is not None:
@@ -376,16 +487,18 @@ class PAResults(CTRFResults):
     def add_from_ctrf(cls, d, kw):
         _results = cls._get(d, "results")
         _tests = cls._get(_results, "tests")
-        tests = [PATestEntry.from_ctrf(t) for t in _tests]
+        from_ctrf = PATestEntry._fast_from_ctrf
+        tests = [from_ctrf(t) for t in _tests]
         kw["tests"] = tests
 
         cls._add_from_extra(kw, d, "grades")
         cls._add_from_extra(kw, d, "notes")
 
     def write_json(self, out_file):
-        with open(str(out_file), "w") as fd:
-            json.dump(self.to_ctrf(), fd,
-                      indent=2)
+        # UTF-8, with non-ASCII text written as-is rather than escaped
+        payload = json_dumpb(self.to_ctrf())
+        with open(str(out_file), "wb") as fd:
+            fd.write(payload)
 
     def show_notes(self):
         if not self.has_notes():
@@ -398,26 +511,24 @@ class PAResults(CTRFResults):
             print("  {}:  {}".format(spec.name, spec.fmt_result()))
 
     def show(self, print_tests=False, descr_on_fail=True, descr_on_pass=True):
-        total = 0
-        passed = 0
-        failed = 0
-        for test in self.tests:
-            if print_tests:
-                print("{}: {:10}  {}".format(test.fmt_result(), test.get_score_str(), test.name))
+        if print_tests:
+            # Collect the per-test lines and write them out in one go
+            out = []
+            for test in self.tests:
+                out.append("{}: {:10}  {}\n".format(test.fmt_result(), test.get_score_str(), test.name))
                 show_output = (test.is_passing() and descr_on_pass) or ((not test.is_passing()) and descr_on_fail)
                 if show_output:
                     _output = test.output
                     output = _output.replace("\n", "\n\t")
-                    print(f"\n{output}")
-
-            if test.is_passing():
-                passed += 1
-            else:
-                failed += 1
+                    out.append(f"\n{output}\n")
+            sys.stdout.write("".join(out))
 
-            total += 1
+        # Counts were computed at construction time
+        total = self.t_total
+        passed = self.t_passed
+        failed = self.t_failed
 
-        if len(self.tests) > 0:
+        if total > 0:
             failed_str = "({} failed)".format(failed) if failed > 0 else ""
             print("=== Tests ===\n  Passed: {} / {} tests {} {:>31}".format(passed, total, failed_str, c.fmt_status_bool(failed == 0)))
         else:
@@ -433,21 +544,15 @@ class PAResults(CTRFResults):
 
 
     def _set_score_info(self):
-        total = 0
-        passed = 0
-        failed = 0
-
-        for test in self.tests:
-            if test.is_passing():
-                passed += 1
-            else:
-                failed += 1
-
-            total += 1
+        total = len(self.tests)
+        passed = sum(1 for t in self.tests if t._passing)
+        failed = total - passed
 
         self.t_passed = passed
         self.t_failed = failed
         self.t_total = total
+        # Want to trigger failure if no tests are present
+        self._passing = (failed == 0) and (total > 0)
 
 def main(input_args):
     t = PATestEntry("aaa", output="yo", status=STATUS_PASS)
@@ -1,21 +1,13 @@
-import os
-import sys
-import json
-import signal
-import shutil
-import pathlib
-import secrets
-import tempfile
 import importlib
-import argparse
-import subprocess
+import importlib.util
 
-from dataclasses import dataclass, field
 #from stest import STest, SResults
 #from summary import GSSummary
 
 from enum import Enum
 
+from json_util import json_loads
+
 
 class ResultType(Enum):
     NONE = "none"
@@ -23,47 +15,67 @@ class ResultType(Enum):
     GRADESCOPE = "gradescope"
     PA = "pa"
 
-SUPPORTED_RESULT_TYPES = set()
+RESULT_MODULES = {
+    ResultType.GRADESCOPE: "gs_test",
+    ResultType.PA: "pa_results",
+}
+
+# Result modules are imported the first time a file of that type is
+# loaded, rather than when this module is imported.  Types whose module
+# can't be found at all are left out here; a module that is found but
+# fails to import is reported when its type is first loaded.
+SUPPORTED_RESULT_TYPES = frozenset(
+    rtype for rtype, mod_name in RESULT_MODULES.items()
+    if importlib.util.find_spec(mod_name) is not None)
 
-RESULT_MODULES = [
-    (ResultType.GRADESCOPE, "gs_test"),
-    (ResultType.PA, "pa_results"),
-]
+_loaded_modules = {}
 
-for rmod in RESULT_MODULES:
-    rtype, mod_name = rmod
-    try:
-        globals()[mod_name] = importlib.import_module(mod_name)
-        SUPPORTED_RESULT_TYPES.add(rtype)
-    except ImportError:
-        pass
+def _get_result_module(rtype):
+    mod = _loaded_modules.get(rtype)
+    if mod is None:
+        try:
+            mod = importlib.import_module(RESULT_MODULES[rtype])
+        except ImportError as e:
+            raise NotImplementedError(f"Unsupported result type {rtype}: {e}") from e
+        _loaded_modules[rtype] = mod
+    return mod
 
 
 class ResultLoader:
 
     @classmethod
-    def load_results(cls, result_type, result_file):
+    def load_results(cls, result_type, result_file, summary_only=False):
+        # With summary_only, returns (passed, failed, total) instead of
+        # a results object
         _type = result_type
 
+        if (_type != ResultType.AUTO) and (_type not in SUPPORTED_RESULT_TYPES):
+            raise NotImplementedError(f"Unsupported result type {result_type}")
+
+        # Parse once, and hand the parsed data to whichever loader applies
+        with open(result_file, "rb") as json_fd:
+            jd = json_loads(json_fd.read())
+
         if result_type == ResultType.AUTO:
-            with open(result_file, "r") as json_fd:
-                jd = json.load(json_fd)
-                if "reportFormat" in jd and jd["reportFormat"] == "CTRF":
-                    _type = ResultType.PA
-                if ("autograder_output" in jd) or ("stdout_visibility" in jd):
-                    _type = ResultType.GRADESCOPE
+            if "reportFormat" in jd and jd["reportFormat"] == "CTRF":
+                _type = ResultType.PA
+            if ("autograder_output" in jd) or ("stdout_visibility" in jd):
+                _type = ResultType.GRADESCOPE
 
         if _type == ResultType.AUTO:
             raise ValueError("Could not auto-detect JSON results")
 
         if _type == ResultType.GRADESCOPE:
-            assert(ResultType.GRADESCOPE in SUPPORTED_RESULT_TYPES)
-
-            res = gs_test.GSResults.from_json_file(result_file)
+            gs_test = _get_result_module(ResultType.GRADESCOPE)
+            res = gs_test.GSResults.from_parsed(jd)
+            if summary_only:
+                return (res.get_total_passed(), res.get_total_failed(), res.get_total_tests())
             return res
         elif _type == ResultType.PA:
-            assert(ResultType.PA in SUPPORTED_RESULT_TYPES)
-            res = pa_results.PAResults.from_json_file(result_file)
+            pa_results = _get_result_module(ResultType.PA)
+            if summary_only:
+                return pa_results.PAResults.summary_from_parsed(jd)
+            res = pa_results.PAResults.from_parsed(jd)
             return res
         else:
             raise NotImplementedError(f"Unsupported result type {result_type}")
@@ -1,9 +1,10 @@
-
+import sys
 
 STATUS_PASS = "passed"
 STATUS_FAIL = "failed"
 
 class STest():
+    __slots__ = ()
 
     def __init__(self):
         pass
@@ -30,6 +31,7 @@ class STest():
         raise NotImplementedError("Subclass must implement")
 
 class SResults():
+    __slots__ = ()
 
     def __init__(self):
         pass
@@ -76,13 +78,15 @@ class SResults():
         total = 0
         passed = 0
         failed = 0
+        # Collect the per-test lines and write them out in one go
+        out = []
         for test in self.get_tests():
-            print("{}: {:10}  {}".format(test.fmt_result(), test.get_score_str(), test.get_name()))
+            out.append("{}: {:10}  {}\n".format(test.fmt_result(), test.get_score_str(), test.get_name()))
             show_output = (test.is_passing() and descr_on_pass) or ((not test.is_passing()) and descr_on_fail)
             if show_output:
                 _output = test.get_output()
                 output = _output.replace("\n", "\n\t")
-                print(f"\n{output}")
+                out.append(f"\n{output}\n")
 
             if test.has_points():
                 total_points += test.max_score
@@ -95,6 +99,7 @@ class SResults():
 
             total += 1
 
+        sys.stdout.write("".join(out))
         print("\n**** SUMMARY ****")
         print("Tests:  {},  PASS:  {}, FAIL:  {}".format(total, passed, failed))
         print("Score:  {}/{}".format(points_earned, total_points))
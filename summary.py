@@ -1,22 +1,22 @@
+import io
 import os
 import sys
-import json
 import html
 import pathlib
 import secrets
-import argparse
-import subprocess
 
 HAS_PYSTACHE = False
+_ANSI_STYLES_CSS = ""
 try:
     import pystache
     import ansi2html
     from ansi2html.style import get_styles
+    _ANSI_STYLES_CSS = "\n".join([f"{x.klass} {{ {x.kw}  }}" for x in get_styles()])
     HAS_PYSTACHE = True
 except ImportError:
     print("Warning:  pystache not found, will not be able to generate summary info")
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 import colors as c
 from colors import color, eprint
@@ -28,14 +28,50 @@ from stest import STest, SResults
 STATUS_PASS = "passed"
 STATUS_FAIL = "failed"
 
+_MISSING = object()
+
 def _get(d, k, default=None):
-    if k in d:
-        return d[k]
+    v = d.get(k, _MISSING)
+    if v is not _MISSING:
+        return v
+    elif default is not None:
+        return default
     else:
-        if default is not None:
-            return default
-        else:
-            raise ValueError(f"{d} not in {d}")
+        raise ValueError(f"{k} not in {d}")
+
+
+# The templates are fixed strings, so parse each one once and render
+# the parsed form afterward
+_parsed_templates = {}
+_renderer = None
+
+def render_template(template, *context, **kwargs):
+    global _renderer
+    if _renderer is None:
+        _renderer = pystache.Renderer()
+
+    parsed = _parsed_templates.get(template)
+    if parsed is None:
+        parsed = pystache.parse(template)
+        _parsed_templates[template] = parsed
+    return _renderer.render(parsed, *context, **kwargs)
+
+
+_ESC = "\x1b"
+_ansi_conv = None
+
+def _get_ansi_conv():
+    global _ansi_conv
+    if _ansi_conv is None:
+        _ansi_conv = ansi2html.Ansi2HTMLConverter()
+    return _ansi_conv
+
+def _escape_twice(s):
+    # Same as html.escape(html.escape(s), quote=False), which is what
+    # ansi2html gives for text without escapes, in one set of replaces
+    return s.replace("&", "&amp;amp;").replace("<", "&amp;lt;") \
+        .replace(">", "&amp;gt;").replace('"', "&amp;quot;") \
+        .replace("'", "&amp;#x27;")
 
 
 def order_by_dict(d, sort="value", reverse=True):
@@ -238,10 +274,32 @@ class SubmissionTest():
     def is_passing(self):
         return self.t.is_passing()
 
+    @property
+    def name_html(self):
+        return self.result.name_html
+
 @dataclass
 class SubmissionResult():
     name: str
     results: SResults
+    name_html: str = field(init=False)
+    total: int = field(init=False)
+    passed: int = field(init=False)
+    failed: int = field(init=False)
+    score: float = field(init=False)
+    max_score: float = field(init=False)
+
+    def __post_init__(self):
+        # Names go into several templates, so escape them once here
+        self.name_html = html.escape(self.name)
+
+        # Results don't change once added, so read the totals once
+        res = self.results
+        self.total = res.get_total_tests()
+        self.passed = res.get_total_passed()
+        self.failed = res.get_total_failed()
+        self.score = res.get_score()
+        self.max_score = res.get_max_score()
 
 
 class SummaryDocument():
@@ -265,23 +323,32 @@ class SummaryDocument():
     def get_passes(self):
         raise NotImplementedError("subclass must implement")
 
+    def _finalize(self):
+        # Subclasses may precompute anything the passes share
+        pass
+
     def _render(self, template, data):
-        out = pystache.render(template, data)
+        out = render_template(template, data)
         self.fd.write(out)
 
     def _write(self, data):
         self.fd.write(data)
 
     def do_summary(self, output_file: str):
-        with open(output_file, "w") as fd:
-            self._fd = fd
-            self.add_header()
+        # Build the whole document in memory, then write it out at once
+        buf = io.StringIO()
+        self._fd = buf
+        self._finalize()
+        self.add_header()
+
+        passes = self.get_passes()
+        for p in passes:
+            p.write(self)
 
-            passes = self.get_passes()
-            for p in passes:
-                p.write(self)
+        self.add_footer()
 
-            self.add_footer()
+        with open(output_file, "w") as fd:
+            fd.write(buf.getvalue())
 
 class SummaryPass():
 
@@ -324,7 +391,7 @@ class Container():
         self.fd.write(content)
 
     def append(self, *args, **kwargs):
-        out = pystache.render(*args, **kwargs)
+        out = render_template(*args, **kwargs)
         self._write(out)
 
     def __enter__(self):
@@ -359,7 +426,9 @@ class GSSummary(SummaryDocument):
     all_tests: set[str]
     passes: list['GSSummaryPass']
     flagged_results: dict[str, list[SubmissionResult]]
-    excluded_names: set[str]
+    test_pass_count: dict[str, int]
+    test_fail_count: dict[str, int]
+    test_names_html: dict[str, str]
 
     TEST_ERROR_NO_PASSING = "No passing tests"
     TEST_ERROR_RUN_FAILURE = "Run failure"
@@ -372,7 +441,11 @@ class GSSummary(SummaryDocument):
         self.test_map = defaultdict(list)
         self.all_tests = set()
         self.flagged_results = defaultdict(list)
-        self.excluded_names = set()
+        self.test_pass_count = defaultdict(int)
+        self.test_fail_count = defaultdict(int)
+        self.test_names_html = {}
+        self._test_stats = {}
+        self._result_bars = {}
 
 
         self.passes = [
@@ -382,6 +455,12 @@ class GSSummary(SummaryDocument):
         ]
         self.style_blocks = []
 
+        # Test outputs show up in more than one pass, so the converted
+        # HTML is kept, keyed by the raw output so that submissions
+        # failing the same way share one conversion
+        self._out_cache = {}
+        self._bar_cache = {}
+
         self._add_ansi_styles()
 
 
@@ -390,31 +469,64 @@ class GSSummary(SummaryDocument):
 
     def add(self, name: str, res: SResults):
         tests = res.get_tests()
-        test_names = [t.name for t in tests]
-        self.all_tests.update(test_names)
+        self.all_tests.update(t.name for t in tests)
 
         sr = SubmissionResult(name=name, results=res)
         self.result_map[name] = sr
 
         if res.is_all_failing():
             self.flagged_results[self.TEST_ERROR_NO_PASSING].append(sr)
-            self.excluded_names.add(name)
             return
 
+        test_map = self.test_map
+        names_html = self.test_names_html
+        pass_count = self.test_pass_count
+        fail_count = self.test_fail_count
         for t in tests:
             t_name = t.name
-            tr = SubmissionTest(name=name, t=t, result=sr)
-            self.test_map[t_name].append(tr)
-
+            test_map[t_name].append(SubmissionTest(name=name, t=t, result=sr))
+            if t_name not in names_html:
+                names_html[t_name] = html.escape(t_name)
+            if t.is_passing():
+                pass_count[t_name] += 1
+            else:
+                fail_count[t_name] += 1
+
+
+    def _finalize(self):
+        # Per-test stats used by more than one pass.  Submissions are
+        # ordered by number of tests passed, most first.
+        def _key(t: SubmissionTest):
+            return t.result.passed
+
+        # Each submission's bar is the same in every per-test row.  Only
+        # submissions listed under some test get one: flagged submissions
+        # (including ones with no tests) never show up in those rows.
+        result_bars = self._result_bars = {}
+
+        self._test_stats = {}
+        for t_name, t_infos in self.test_map.items():
+            for t in t_infos:
+                if t.name not in result_bars:
+                    sr = t.result
+                    result_bars[t.name] = self._make_bar(sr.passed, max=sr.total)
+
+            passing, failing = split_passing(sorted(t_infos, key=_key, reverse=True))
+            self._test_stats[t_name] = {
+                "passing": passing,
+                "failing": failing,
+                "bar": self._make_bar(self.test_pass_count[t_name], max=len(t_infos)),
+            }
 
     def total_submissions_with_failing(self):
         return len(self.result_map)
 
     def total_submissions(self):
-        return len(self.result_map) - len(self.excluded_names)
+        return len(self.result_map) - self.total_failing()
 
     def total_failing(self):
-        return len(self.excluded_names)
+        # Flagged submissions are left out of the per-test stats
+        return sum(len(v) for v in self.flagged_results.values())
 
     def get_test_results(self, test_name):
         if test_name not in self.all_tests:
@@ -425,9 +537,7 @@ class GSSummary(SummaryDocument):
         self.style_blocks.append(block)
 
     def _add_ansi_styles(self):
-        styles = get_styles()
-        styles_as_css = "\n".join([f"{x.klass} {{ {x.kw}  }}" for x in styles])
-        self._add_style(styles_as_css)
+        self._add_style(_ANSI_STYLES_CSS)
 
     def add_header(self):
         all_styles = "\n".join(self.style_blocks)
@@ -439,45 +549,88 @@ class GSSummary(SummaryDocument):
     def add_footer(self):
         self._render(TEMPLATE_END, {"run_id": self.run_id})
 
-    def _ffc(self, n, proc=lambda x: x != 0):
-        return "<span class=\"fail\">{}</span>".format(n) if proc(n) else str(n)
+    def _ffc(self, n):
+        # Highlight nonzero failure counts
+        return f"<span class=\"fail\">{n}</span>" if n != 0 else str(n)
 
-    def _ffs(self, n, proc=lambda x: x != 0):
+    def _ffs(self, n):
+        # Status cells are nearly always one of these two
         if n == "PASS":
-            return "<span class=\"pass\">{}</span>".format(str(n))
+            return _PASS_HTML
+        elif n == "FAIL":
+            return _FAIL_HTML
         else:
-            return self._ffc(n, proc=lambda x: x != "PASS")
+            return f"<span class=\"fail\">{n}</span>"
 
     def _prepare_output(self, output):
-        _output = html.escape(output + c.ENDC)
-        conv = ansi2html.Ansi2HTMLConverter()
-        _output = conv.convert(c.ENDC + _output + c.ENDC, full=False)
+        _output = self._out_cache.get(output)
+        if _output is not None:
+            return _output
+
+        if _ESC not in output:
+            # Nothing for ansi2html to do except escape the text again
+            _output = _escape_twice(output)
+        else:
+            # Reset styles on both ends; escaping can't touch ENDC itself
+            _output = _get_ansi_conv().convert(f"{c.ENDC}{html.escape(output)}{c.ENDC}", full=False)
+
+        self._out_cache[output] = _output
         return _output
 
     def _get_bar_color(self, val):
-        if val < 1:
-            return "bar-grey"
-        elif val < 70:
-            return "bar-red"
-        elif val < 80:
-            return "bar-orange"
-        elif val < 90:
-            return "bar-yellow"
-        else:
-            return "bar-green"
+        for limit, bar_class in _BAR_THRESHOLDS:
+            if val < limit:
+                return bar_class
 
     def _perc(self, count, total, figs=1):
+        if total == 0:
+            return 0.0
         perc = round((count / total) * 100, figs)
         return perc
 
     def _make_bar(self, value, max=100, perc=True, text=None, color_proc=None):
-        p = round((value / max) * 100, 0)
+        # Many bars share the same counts (e.g. submissions with the same
+        # number of tests passed), so reuse ones already built
+        key = (value, max, perc, text) if color_proc is None else None
+        if key is not None:
+            bar = self._bar_cache.get(key)
+            if bar is not None:
+                return bar
+
+        # An empty bar, rather than a crash, for a count out of 0
+        p = round((value / max) * 100, 0) if max != 0 else 0.0
         width = p
-        _text = text if text is not None else str("{}%".format(self._perc(value, max) if perc else value))
-        _color_proc = color_proc if color_proc is not None else \
-            lambda x: self._get_bar_color(x)
+        _text = text if text is not None else f"{self._perc(value, max) if perc else value}%"
+        _color_proc = color_proc if color_proc is not None else self._get_bar_color
+        bar_class = _color_proc(p if perc else value)
+
+        bar = f"<div class=\"bar-outer\"><div class=\"bar-inner {bar_class}\" style=\"width:{width}%\"></div><div class=\"bar-text\">{_text}</div></div>"
+        if key is not None:
+            self._bar_cache[key] = bar
+        return bar
+
+def split_passing(tests):
+    # One pass over tests, returning (passing, failing) in their
+    # original order
+    passing = []
+    failing = []
+    for t in tests:
+        (passing if t.is_passing() else failing).append(t)
+    return passing, failing
+
+
+_PASS_HTML = "<span class=\"pass\">PASS</span>"
+_FAIL_HTML = "<span class=\"fail\">FAIL</span>"
+
+# (upper bound, class) for _make_bar, checked in order
+_BAR_THRESHOLDS = (
+    (1, "bar-grey"),
+    (70, "bar-red"),
+    (80, "bar-orange"),
+    (90, "bar-yellow"),
+    (float("inf"), "bar-green"),
+)
 
-        return "<div class=\"bar-outer\"><div class=\"bar-inner {}\" style=\"width:{}%\"></div><div class=\"bar-text\">{}</div></div>".format(_color_proc(p if perc else value), width, _text)
 
 class GSSummaryPass(SummaryPass):
 
@@ -508,7 +661,7 @@ class AllTestSummary(GSSummaryPass):
     <th>Test name</th><th>Passing</th><th>Failing</th><th>%</th>
     </tr>
     {{ #tests }}
-    <tr><td><a href="#test-{{name}}">{{ name }}</a></td><td>{{ count_passing }}</td><td>{{{ count_failing }}}</td><td>{{{ percent }}}</td></tr>
+    <tr><td><a href="#test-{{{name}}}">{{{ name }}}</a></td><td>{{ count_passing }}</td><td>{{{ count_failing }}}</td><td>{{{ percent }}}</td></tr>
     {{ /tests }}
     </table>
 
@@ -517,7 +670,7 @@ class AllTestSummary(GSSummaryPass):
     <h4>{{ name }} ({{ count }})</h4>
     <ul>
     {{ #submissions }}
-    <li><a href="#results-{{ . }}">{{ . }}</a></li>
+    <li><a href="#results-{{{ . }}}">{{{ . }}}</a></li>
     {{ /submissions }}
     </ul>
     {{ /counts }}
@@ -527,16 +680,10 @@ class AllTestSummary(GSSummaryPass):
         pass
 
     def write(self, doc: GSSummary):
+        # Rows are generated as the template consumes them
         to_render = {
-            "tests": [
-                {
-                    "name": t_name,
-                    "count_passing": len([t for t in t_infos if t.is_passing()]),
-                    "count_failing": doc._ffc(len([t for t in t_infos if not t.is_passing()])),
-                    "percent": doc._make_bar(len([t for t in t_infos if t.is_passing()]),
-                                             max=len([t for t in t_infos])),
-                 } for t_name, t_infos in doc.test_map.items()
-            ]
+            "tests": (self._make_test(doc, t_name, stats)
+                      for t_name, stats in doc._test_stats.items()),
         }
 
         count_info = []
@@ -550,7 +697,7 @@ class AllTestSummary(GSSummaryPass):
             count_info.append({
                 "name": name,
                 "count": _count,
-                "submissions": [s.name for s in submissions] if submissions is not None else [],
+                "submissions": [s.name_html for s in submissions] if submissions is not None else [],
                 "percent": doc._make_bar(_count, max=total),
 
             })
@@ -566,74 +713,39 @@ class AllTestSummary(GSSummaryPass):
         to_render["counts"] = count_info
         doc._render(self.TEMPLATE, to_render)
 
+    def _make_test(self, doc: GSSummary, t_name, stats):
+        return {
+            "name": doc.test_names_html[t_name],
+            "count_passing": doc.test_pass_count[t_name],
+            "count_failing": doc._ffc(doc.test_fail_count[t_name]),
+            "percent": stats["bar"],
+        }
+
 class PerTestSummary(GSSummaryPass):
 
-    TEMPLATE_ORIG = """
-    <h1 id="per-test">Per-test summary</h1>
-    {{ #tests }}
-    <div id="c-pertest-{{ name }}">
-    <h2 id="test-{{name}}">{{name}}</h2>
-    Passing ({{{count_passing}}}):
-    <ul>
-    {{ #t_passing }}
-    <li><details><summary>{{ name }} {{score}}</summary><pre>{{{output}}}</pre></details></li>
-    {{ /t_passing }}
-    </ul>
-    <br />
-    Failing ({{{count_failing}}}):
-    <ul>
-    {{ #t_failing }}
-    <li><details><summary>{{ name }} {{score}}</summary><pre>{{{output}}}</pre></details></li>
-    {{ /t_failing }}
-    </ul>
-    </div>
-    {{ /tests }}
-    """
+    # Passing outputs are still shown in each submission's results
+    # (linked from the row), so leave them out of the per-test lists
+    SKIP_PASSING_OUTPUT = True
 
     TEMPLATE = """
     <h1 id="per-test">Per-test summary</h1>
 
     {{ #tests }}
-    <h2 id="test-{{ name }}">{{ name }}</h2>
+    <h2 id="test-{{{ name }}}">{{{ name }}}</h2>
     <table class="table-pertest-summary">
     <tr>
     <th>Test name</th><th>Passing</th><th>Failing</th><th>%</th>
     </tr>
-    <tr><td>{{ name }}</td><td>{{ count_passing }}</td><td>{{{ count_failing }}}</td><td>{{{ percent }}}</td></tr>
+    <tr><td>{{{ name }}}</td><td>{{ count_passing }}</td><td>{{{ count_failing }}}</td><td>{{{ percent }}}</td></tr>
     </table>
     <br /><br />
-    <div id="c-pertest-{{ name }}">
-    <a href="javascript:;" onclick="expandAllDetails('c-pertest-{{name}}');" class="link-btn-underline">[Show/hide output]</a>
+    <div id="c-pertest-{{{ name }}}">
+    <a href="javascript:;" onclick="expandAllDetails('c-pertest-{{{name}}}');" class="link-btn-underline">[Show/hide output]</a>
     <table class="table-pertest-submissions">
     <tr>
     <th width="5%">S</th><th width="80%">Name</th><th>Score</th>
     </tr>
-    {{ #t_failing }}
-    <tr class="row-fail">
-    <td class="test-row-status fill-fail">❌</td>
-    <td>
-      {{ name }}  <a href="#results-{{name}}" class="link-btn">🔍</a><br /><details class="test-output"><summary class="test-output">Output</summary>
-      <pre>
-      {{{ output }}}
-      </pre>
-      </details>
-    </td>
-    <td>{{{ score }}} {{{ percent }}}</td>
-    </tr>
-    {{ /t_failing }}
-    {{ #t_passing }}
-    <tr>
-    <td class="test-row-status fill-pass">✅</td>
-    <td>
-      {{ name }}<a href="#results-{{name}}" class="link-btn">🔍</a><br /><details class="test-output"><summary class="test-output">Output</summary>
-      <pre>
-      {{{ output }}}
-      </pre>
-      </details>
-    </td>
-    <td>{{{ score }}} {{{ percent }}}</td>
-    </tr>
-    {{ /t_passing }}
+    {{{ t_failing }}}{{{ t_passing }}}
     </table>
     </div>
     {{ /tests }}
@@ -643,45 +755,76 @@ class PerTestSummary(GSSummaryPass):
         pass
 
     def write(self, doc: GSSummary):
-        def _order(x: list[SubmissionTest], reverse=True):
-            return sorted(x, key=lambda x: x.result.results.get_total_passed(), reverse=reverse)
-
+        # Rows are generated as the template consumes them, so only one
+        # test's row data is alive at a time
         to_render = {
-            "tests": [
-                {
-                    "name": t_name,
-                    "count_passing": len([t for t in t_infos if t.is_passing()]),
-                    "count_failing": doc._ffc(len([t for t in t_infos if not t.is_passing()])),
-                    "percent": doc._make_bar(len([t for t in t_infos if t.is_passing()]),
-                                             max=len([t for t in t_infos])),
-                    "t_passing": [{
-                        "name": t.name,
-                        "score": t.t.get_score_str(),
-                        "percent": doc._make_bar(t.result.results.get_total_passed(),
-                                                 max=t.result.results.get_total_tests()),
-                        "output": doc._prepare_output(t.t.get_output()),
-                    } for t in _order(t_infos) if t.is_passing()],
-                    "t_failing": [{
-                        "name": t.name,
-                        "score": t.t.get_score_str(),
-                        "output": doc._prepare_output(t.t.get_output()),
-                        "percent": doc._make_bar(t.result.results.get_total_passed(),
-                                                 max=t.result.results.get_total_tests()),
-                    } for t in _order(t_infos) if not t.is_passing()],
-                 } for t_name, t_infos in doc.test_map.items()
-            ]
+            "tests": (self._make_test(doc, t_name, stats)
+                      for t_name, stats in doc._test_stats.items()),
         }
         doc._render(self.TEMPLATE, to_render)
 
+    def _make_test(self, doc: GSSummary, t_name, stats):
+        passing = stats["passing"]
+        failing = stats["failing"]
+        # Rows are plain interpolation, so they skip the template engine
+        skip_output = self.SKIP_PASSING_OUTPUT
+        return {
+            "name": doc.test_names_html[t_name],
+            "count_passing": len(passing),
+            "count_failing": doc._ffc(len(failing)),
+            "percent": stats["bar"],
+            "t_failing": "".join([self._make_fail_row(doc, t) for t in failing]),
+            "t_passing": "".join([self._make_pass_row(doc, t, skip_output) for t in passing]),
+        }
+
+    def _make_fail_row(self, doc: GSSummary, t: SubmissionTest):
+        name = t.name_html
+        score = t.t.get_score_str()
+        percent = doc._result_bars[t.name]
+        output = doc._prepare_output(t.t.get_output())
+        return (f"\n    <tr class=\"row-fail\">\n"
+                f"    <td class=\"test-row-status fill-fail\">❌</td>\n"
+                f"    <td>\n"
+                f"      {name}  <a href=\"#results-{name}\" class=\"link-btn\">🔍</a><br /><details class=\"test-output\"><summary class=\"test-output\">Output</summary>\n"
+                f"      <pre>\n"
+                f"      {output}\n"
+                f"      </pre>\n"
+                f"      </details>\n"
+                f"    </td>\n"
+                f"    <td>{score} {percent}</td>\n"
+                f"    </tr>")
+
+    def _make_pass_row(self, doc: GSSummary, t: SubmissionTest, skip_output=False):
+        name = t.name_html
+        score = t.t.get_score_str()
+        percent = doc._result_bars[t.name]
+        if skip_output:
+            details = ""
+        else:
+            output = doc._prepare_output(t.t.get_output())
+            details = (f"<br /><details class=\"test-output\"><summary class=\"test-output\">Output</summary>\n"
+                       f"      <pre>\n"
+                       f"      {output}\n"
+                       f"      </pre>\n"
+                       f"      </details>")
+        return (f"\n    <tr>\n"
+                f"    <td class=\"test-row-status fill-pass\">✅</td>\n"
+                f"    <td>\n"
+                f"      {name}<a href=\"#results-{name}\" class=\"link-btn\">🔍</a>{details}\n"
+                f"    </td>\n"
+                f"    <td>{score} {percent}</td>\n"
+                f"    </tr>")
+
 
 class PerStudentResults(GSSummaryPass):
 
     TEMPLATE_STUDENT_HEAD = """
     <h1 id="results">Test results</h1>
+
     """
 
-    TEMPLATE_STUDENT_SUMMARY = """
-    <h2 id="results-{{name}}">{{name}}</h2>
+    # Summary and per-test table head for one submission
+    TEMPLATE_STUDENT = """<h2 id="results-{{{name}}}">{{{name}}}</h2>
     <table>
     <tr><td>Total</td><td>{{total}}</td></tr>
     <tr><td>Passed</td><td>{{passed}}</td></tr>
@@ -690,25 +833,16 @@ class PerStudentResults(GSSummaryPass):
     </table>
     <br />
     <br />
-    """
 
-    TEMPLATE_STUDENT_TEST = """
-    <h3 id="results-bytest-{{name}}">Per-test results</h3>
-    <div id="c-perstudent-{{ name }}">
-    <a href="javascript:;" onclick="expandAllDetails('c-perstudent-{{ name }}');" class="link-btn-underline">[Show/hide output]</a>
+    <h3 id="results-bytest-{{{name}}}">Per-test results</h3>
+    <div id="c-perstudent-{{{ name }}}">
+    <a href="javascript:;" onclick="expandAllDetails('c-perstudent-{{{ name }}}');" class="link-btn-underline">[Show/hide output]</a>
     <table>
     <tr>
     <th>Test</th><th width="15%">Score</td><th width="15%">Status</td>
-    </tr>
-    {{ #tests }}
-    <tr><td>{{ name }} <br /><details class="test-output"><summary class="test-output">Output</summary>
-    <pre>
-    {{{ output }}}
-    </pre>
-    </details>
-    </td>
-    <td>{{ score }}</td><td>{{{ status }}}</td></tr>
-    {{ /tests }}
+    </tr>"""
+
+    TEMPLATE_STUDENT_TEST_END = """
     </table>
     </div>
     <br />
@@ -720,47 +854,34 @@ class PerStudentResults(GSSummaryPass):
         pass
 
     def write(self, doc: GSSummary):
-        to_render = {
-            "results": [
-                {
-                    "name": r_name,
-                    "total": sr.results.get_total_tests(),
-                    "passed": sr.results.get_total_passed(),
-                    "failed": doc._ffc(sr.results.get_total_failed()),
-                    "score": sr.results.get_score(),
-                    "max_score": sr.results.get_max_score(),
-                    "tests": [{
-                        "name": t.get_name(),
-                        "status": doc._ffs("PASS" if t.is_passing() else "FAIL"),
-                        "score": t.get_score_str(),
-                        "output": doc._prepare_output(t.get_output()),
-                    }
-                              for t in sr.results.get_tests()]
-                } for r_name, sr in doc.result_map.items()
-            ],
-        }
-        header = {}
-        doc._render(self.TEMPLATE_STUDENT_HEAD, header)
+        doc._write(self.TEMPLATE_STUDENT_HEAD)
 
-        for r_name, sr in doc.result_map.items():
+        # One render per submission for its summary and table head.
+        # Rows are rendered for every test of every submission, so they
+        # skip the template engine and are written one at a time.
+        for sr in doc.result_map.values():
             d = {
-                "name": r_name,
-                "total": sr.results.get_total_tests(),
-                "passed": sr.results.get_total_passed(),
-                "failed": doc._ffc(sr.results.get_total_failed()),
-                "score": sr.results.get_score(),
-                "max_score": sr.results.get_max_score(),
-            }
-            doc._render(self.TEMPLATE_STUDENT_SUMMARY, d)
-
-            tests_to_print = [t for t in sr.results.get_tests()]
-            test_data = {
-                "tests": [{
-                    "name": t.get_name(),
-                    "status": doc._ffs("PASS" if t.is_passing() else "FAIL"),
-                    "score": t.get_score_str(),
-                    "output": doc._prepare_output(t.get_output()),
-                } for t in tests_to_print],
+                "name": sr.name_html,
+                "total": sr.total,
+                "passed": sr.passed,
+                "failed": doc._ffc(sr.failed),
+                "score": sr.score,
+                "max_score": sr.max_score,
             }
-            d.update(test_data)
-            doc._render(self.TEMPLATE_STUDENT_TEST, d)
+            doc._render(self.TEMPLATE_STUDENT, d)
+            for t in sr.results.get_tests():
+                doc._write(self._make_row(doc, t))
+            doc._write(self.TEMPLATE_STUDENT_TEST_END)
+
+    def _make_row(self, doc: GSSummary, t: STest):
+        name = html.escape(str(t.get_name()))
+        score = html.escape(str(t.get_score_str()))
+        status = doc._ffs("PASS" if t.is_passing() else "FAIL")
+        output = doc._prepare_output(t.get_output())
+        return (f"\n    <tr><td>{name} <br /><details class=\"test-output\"><summary class=\"test-output\">Output</summary>\n"
+                f"    <pre>\n"
+                f"    {output}\n"
+                f"    </pre>\n"
+                f"    </details>\n"
+                f"    </td>\n"
+                f"    <td>{score}</td><td>{status}</td></tr>")
@@ -0,0 +1,68 @@
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import json_util
+from json_util import json_dumps, json_dumpb, json_loads
+from pa_results import PAResults, PATestEntry, STATUS_PASS, STATUS_FAIL
+from compare import CompareResult
+
+
+def _make_results(status=STATUS_PASS):
+    tests = [
+        PATestEntry(name="café", status=status, output="naïve ✓"),
+        PATestEntry(name="plain", status=STATUS_PASS, output="ok"),
+    ]
+    return PAResults(execution_time=0, tests=tests)
+
+
+class TestJsonBackends(unittest.TestCase):
+
+    def _both_backends(self, fn):
+        # Result of fn() with the stdlib fallback, then with orjson
+        with mock.patch.object(json_util, "HAS_ORJSON", False):
+            fallback = fn()
+        if not json_util.HAS_ORJSON:
+            self.skipTest("orjson not installed")
+        return fallback, fn()
+
+    def test_dumps_same_output(self):
+        obj = {"name": "café", "tags": ["ü"], "n": 1, "x": None}
+        fallback, fast = self._both_backends(lambda: json_dumps(obj))
+        self.assertEqual(fallback, fast)
+        fallback, fast = self._both_backends(lambda: json_dumpb(obj))
+        self.assertEqual(fallback, fast)
+
+    def test_results_round_trip(self):
+        res = _make_results()
+        with tempfile.TemporaryDirectory() as tmp:
+            def _write():
+                out_file = os.path.join(tmp, "results.json")
+                res.write_json(out_file)
+                with open(out_file, "rb") as fd:
+                    return fd.read()
+
+            fallback, fast = self._both_backends(_write)
+            self.assertEqual(fallback, fast)
+
+            loaded = PAResults.from_parsed(json_loads(fast))
+            self.assertEqual([t.name for t in loaded.get_tests()], ["café", "plain"])
+            self.assertEqual(loaded.get_test("café").output, "naïve ✓")
+
+    def test_compare_same_output(self):
+        cr = CompareResult(_make_results(STATUS_FAIL), _make_results())
+
+        def _write():
+            fd = io.StringIO()
+            cr.write_ctrf(fd)
+            return fd.getvalue()
+
+        fallback, fast = self._both_backends(_write)
+        self.assertEqual(fallback, fast)
+        self.assertIn("café", fast)
+
+
+if __name__ == "__main__":
+    unittest.main()
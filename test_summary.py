@@ -0,0 +1,35 @@
+import os
+import tempfile
+import unittest
+
+from pa_results import PAResults, PATestEntry, STATUS_PASS, STATUS_FAIL
+from summary import GSSummary
+
+
+class TestGSSummary(unittest.TestCase):
+
+    def _write_summary(self, summary):
+        with tempfile.TemporaryDirectory() as tmp:
+            out_file = os.path.join(tmp, "summary.html")
+            summary.do_summary(out_file)
+            with open(out_file, "r", encoding="utf-8") as fd:
+                return fd.read()
+
+    def test_empty_submission(self):
+        # pa_run writes results with no tests for runs that fail early
+        tests = [
+            PATestEntry(name="t1", status=STATUS_PASS, output="ok"),
+            PATestEntry(name="t2", status=STATUS_FAIL, output="bad"),
+        ]
+        summary = GSSummary("run")
+        summary.add("alice", PAResults(execution_time=0, tests=tests))
+        summary.add("bob", PAResults.from_empty())
+
+        html = self._write_summary(summary)
+        self.assertIn("results-alice", html)
+        self.assertIn("results-bob", html)
+        self.assertEqual(summary.total_failing(), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()